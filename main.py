@@ -1,6 +1,14 @@
 # Main entry point for the Sales Analytics System
 
-from utils.file_handler import read_sales_data
+import argparse
+import time
+
+from utils.file_handler import (
+    read_sales_data,
+    new_tail_state,
+    read_appended_lines,
+    close_tail_state
+)
 from utils.data_processor import (
     parse_transactions,
     validate_and_filter,
@@ -8,11 +16,16 @@ from utils.data_processor import (
     region_wise_sales,
     top_selling_products,
     customer_analysis,
+    customer_analysis_external,
     daily_sales_trend,
     find_peak_sales_day,
     low_performing_products,
-    generate_sales_report
+    generate_sales_report,
+    new_sales_aggregates,
+    update_sales_aggregates,
+    write_sales_report
 )
+from utils.id_store import load_id_store, save_id_store
 from utils.api_handler import (
     fetch_all_products,
     create_product_mapping,
@@ -20,7 +33,13 @@ from utils.api_handler import (
 )
 
 
-def main():
+def main(memory_budget=None, id_store_file=None, bloom_bits=None):
+    """
+    Runs the full pipeline once. Duplicate TransactionIDs within the file
+    are always removed; with id_store_file, IDs accepted by earlier runs
+    are dropped too, so only rows that are new since then are reported
+    """
+
     try:
         print("=" * 40)
         print("SALES ANALYTICS SYSTEM")
@@ -67,20 +86,34 @@ def main():
 
         # [4/10] Validate transactions
         print("\n[4/10] Validating transactions...")
+        id_store = load_id_store(id_store_file, bloom_bits_per_id=bloom_bits)
         valid_tx, invalid_count, summary = validate_and_filter(
             parsed_transactions,
             region=region_filter if region_filter else None,
             min_amount=min_amount,
-            max_amount=max_amount
+            max_amount=max_amount,
+            id_store=id_store
+        )
+        print(
+            f"✓ Valid: {len(valid_tx)} | Invalid: {invalid_count} | "
+            f"Duplicates removed: {summary['duplicates']}"
         )
-        print(f"✓ Valid: {len(valid_tx)} | Invalid: {invalid_count}")
 
         # [5/10] Perform analyses
         print("\n[5/10] Analyzing sales data...")
         calculate_total_revenue(valid_tx)
         region_wise_sales(valid_tx)
         top_selling_products(valid_tx)
-        customer_analysis(valid_tx)
+        if memory_budget is not None:
+            # Disk-backed mode for very large customer counts
+            customer_analysis_external(
+                valid_tx,
+                memory_budget=memory_budget,
+                output_file="output/customer_analysis.txt"
+            )
+            print("✓ Customer analysis saved to: output/customer_analysis.txt")
+        else:
+            customer_analysis(valid_tx)
         daily_sales_trend(valid_tx)
         find_peak_sales_day(valid_tx)
         low_performing_products(valid_tx)
@@ -110,6 +143,10 @@ def main():
         generate_sales_report(valid_tx, enriched_transactions)
         print("✓ Report saved to: output/sales_report.txt")
 
+        if id_store_file:
+            save_id_store(id_store)
+            print(f"✓ Transaction IDs saved to: {id_store_file}")
+
         # [10/10] Complete
         print("\n[10/10] Process Complete!")
         print("=" * 40)
@@ -120,6 +157,123 @@ def main():
         print("Please check input files or try again.")
 
 
+def watch(input_file="data/sales_data.txt", report_file="output/sales_report.txt",
+          interval=5.0, batch_rows=500, poll_interval=0.5):
+    """
+    Tails the sales file and keeps the report current as lines are appended.
+    New lines are batched through parse -> validate -> enrich and added to
+    running aggregates; the report is re-rendered once batch_rows lines are
+    pending or the oldest pending line is interval seconds old.
+    When the file is rotated, the rest of the old file is applied first;
+    after a rotation or truncation the aggregates and TransactionID store
+    start over, so the report always describes the current file
+    """
+
+    print("=" * 40)
+    print("SALES ANALYTICS SYSTEM - WATCH MODE")
+    print("=" * 40)
+
+    # Catalog is fetched once and reused for every batch
+    print("\nFetching product data from API...")
+    product_mapping = create_product_mapping(fetch_all_products())
+
+    tail_state = new_tail_state()
+    id_store = load_id_store()
+    aggregates = new_sales_aggregates()
+
+    pending = []
+    pending_since = None
+
+    print(f"\nWatching {input_file} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            new_lines = read_appended_lines(input_file, tail_state)
+            if new_lines:
+                if not pending:
+                    pending_since = time.monotonic()
+                pending.extend(new_lines)
+
+            restarted = tail_state["restarted"]
+            if restarted:
+                tail_state["restarted"] = None
+
+                # Finish the report for the rotated file; lines pending from
+                # a truncated file no longer exist and are dropped
+                if restarted == "rotated" and pending:
+                    _apply_batch(pending, product_mapping, id_store, aggregates,
+                                 report_file, pending_since)
+
+                pending = []
+                id_store = load_id_store()
+                aggregates = new_sales_aggregates()
+                write_sales_report(aggregates, report_file)
+                print(f"Input file {restarted}, report restarted from the new contents")
+                continue
+
+            if pending and (
+                len(pending) >= batch_rows
+                or time.monotonic() - pending_since >= interval
+            ):
+                _apply_batch(pending, product_mapping, id_store, aggregates,
+                             report_file, pending_since)
+                pending = []
+
+            if not new_lines:
+                time.sleep(poll_interval)
+
+    except KeyboardInterrupt:
+        if pending:
+            _apply_batch(pending, product_mapping, id_store, aggregates,
+                         report_file, pending_since)
+        print("\nWatch stopped. Report saved to:", report_file)
+
+    finally:
+        close_tail_state(tail_state)
+
+
+def _apply_batch(lines, product_mapping, id_store, aggregates, report_file, pending_since):
+    parsed = parse_transactions(lines)
+    valid_tx, invalid_count, summary = validate_and_filter(
+        parsed, id_store=id_store, verbose=False
+    )
+    enriched = enrich_sales_data(valid_tx, product_mapping, output_file=None)
+    update_sales_aggregates(aggregates, valid_tx, enriched)
+    write_sales_report(aggregates, report_file)
+
+    latency = time.monotonic() - pending_since
+    print(
+        f"✓ Report updated: +{len(lines)} lines | "
+        f"{len(valid_tx)} valid, {invalid_count} invalid, "
+        f"{summary['duplicates']} duplicates dropped | "
+        f"{aggregates['total_transactions']} transactions | "
+        f"latency {latency * 1000:.0f} ms"
+    )
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Sales Analytics System")
+    parser.add_argument("--watch", action="store_true",
+                        help="tail the sales file and update the report as lines are appended")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="watch mode: max seconds before pending lines are applied")
+    parser.add_argument("--batch-rows", type=int, default=500,
+                        help="watch mode: apply pending lines once this many are buffered")
+    parser.add_argument("--memory-budget", type=int, default=None,
+                        help="run customer analysis on disk, holding at most this many customers in memory")
+    parser.add_argument("--id-store", default=None,
+                        help="file of TransactionIDs from earlier runs; rows already in it are dropped")
+    parser.add_argument("--bloom-bits", type=int, default=None,
+                        help="Bloom filter bits per ID in the ID store (~10 for large histories, "
+                             "0 removes it; default keeps the store's setting)")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(interval=args.interval, batch_rows=args.batch_rows)
+    else:
+        main(
+            memory_budget=args.memory_budget,
+            id_store_file=args.id_store,
+            bloom_bits=args.bloom_bits
+        )
 
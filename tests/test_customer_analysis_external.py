@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from utils.data_processor import customer_analysis, customer_analysis_external
+
+
+def make_transactions(n, customers, seed=1):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield {
+            "CustomerID": f"C{rng.randrange(customers):03d}",
+            "Quantity": rng.randint(1, 5),
+            # Exact binary fractions so spilled partial sums add up exactly
+            "UnitPrice": rng.choice([100.0, 250.5, 3.25]),
+            "ProductName": rng.choice(["Mouse", "Laptop", "Webcam", "USB Cable"])
+        }
+
+
+def as_rows(customers):
+    return [
+        (
+            cid,
+            data["total_spent"],
+            data["purchase_count"],
+            data["avg_order_value"],
+            sorted(data["products_bought"])
+        )
+        for cid, data in customers
+    ]
+
+
+@pytest.mark.parametrize("memory_budget", [1, 7, 100000])
+def test_matches_customer_analysis(memory_budget):
+    transactions = list(make_transactions(2000, 300))
+
+    expected = as_rows(customer_analysis(transactions).items())
+    result = customer_analysis_external(
+        transactions, memory_budget=memory_budget, top_k=len(expected)
+    )
+
+    assert as_rows(result) == expected
+
+
+def test_top_k_and_output_file(tmp_path):
+    transactions = list(make_transactions(500, 40))
+    output_file = tmp_path / "customers.txt"
+
+    expected = list(customer_analysis(transactions))
+    result = customer_analysis_external(
+        transactions, memory_budget=5, top_k=3, output_file=str(output_file)
+    )
+
+    assert [cid for cid, _ in result] == expected[:3]
+
+    lines = output_file.read_text().splitlines()
+    assert lines[0].startswith("CustomerID|")
+    assert [line.split("|")[0] for line in lines[1:]] == expected
+
+
+def test_accepts_generator():
+    result = customer_analysis_external(make_transactions(1000, 200), memory_budget=10)
+    assert len(result) == 5
+
+
+def test_rejects_empty_budget():
+    with pytest.raises(ValueError):
+        customer_analysis_external([], memory_budget=0)
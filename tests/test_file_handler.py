@@ -0,0 +1,98 @@
+import os
+
+from utils.file_handler import close_tail_state, new_tail_state, read_appended_lines
+
+HEADER = b"TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"
+
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_partial_line_held_back(tmp_path):
+    path = str(tmp_path / "sales.txt")
+    state = new_tail_state()
+
+    write(path, HEADER + b"T1|a\nT2|pa")
+    assert read_appended_lines(path, state) == ["T1|a"]
+    assert read_appended_lines(path, state) == []
+
+    append(path, b"rt\n\nT3|c\n")
+    assert read_appended_lines(path, state) == ["T2|part", "T3|c"]
+    assert state["restarted"] is None
+
+    close_tail_state(state)
+
+
+def test_truncation_restarts(tmp_path):
+    path = str(tmp_path / "sales.txt")
+    state = new_tail_state()
+
+    write(path, HEADER + b"T1|a\nT2|b\n")
+    read_appended_lines(path, state)
+
+    write(path, HEADER)
+    assert read_appended_lines(path, state) == []
+    assert state["restarted"] == "truncated"
+
+    state["restarted"] = None
+    append(path, b"T3|c\n")
+    assert read_appended_lines(path, state) == ["T3|c"]
+
+    close_tail_state(state)
+
+
+def test_rewrite_to_larger_size_restarts(tmp_path):
+    path = str(tmp_path / "sales.txt")
+    state = new_tail_state()
+
+    write(path, HEADER + b"T1|a\n")
+    read_appended_lines(path, state)
+
+    write(path, HEADER + b"T9|" + b"x" * 100 + b"\n")
+    assert read_appended_lines(path, state) == []
+    assert state["restarted"] == "truncated"
+
+    state["restarted"] = None
+    assert read_appended_lines(path, state) == ["T9|" + "x" * 100]
+
+    close_tail_state(state)
+
+
+def test_rotation_drains_old_file(tmp_path):
+    path = str(tmp_path / "sales.txt")
+    state = new_tail_state()
+
+    write(path, HEADER + b"T1|a\n")
+    assert read_appended_lines(path, state) == ["T1|a"]
+
+    # Written to the old file just before it was rotated away
+    append(path, b"T2|b\nT3|no-newline")
+    os.rename(path, path + ".1")
+    write(path, HEADER + b"T4|d\n")
+
+    assert read_appended_lines(path, state) == ["T2|b", "T3|no-newline"]
+    assert state["restarted"] == "rotated"
+
+    state["restarted"] = None
+    assert read_appended_lines(path, state) == ["T4|d"]
+
+    close_tail_state(state)
+
+
+def test_missing_file(tmp_path):
+    path = str(tmp_path / "sales.txt")
+    state = new_tail_state()
+
+    assert read_appended_lines(path, state) == []
+
+    write(path, HEADER + b"T1|a\n")
+    assert read_appended_lines(path, state) == ["T1|a"]
+
+    close_tail_state(state)
@@ -0,0 +1,109 @@
+import pytest
+
+from utils.data_processor import validate_and_filter
+from utils.id_store import add_id, is_duplicate_id, load_id_store, save_id_store
+
+
+def make_tx(transaction_id, region="North"):
+    return {
+        "TransactionID": transaction_id,
+        "Date": "2024-12-01",
+        "ProductID": "P101",
+        "ProductName": "Mouse",
+        "Quantity": 1,
+        "UnitPrice": 100.0,
+        "CustomerID": "C001",
+        "Region": region
+    }
+
+
+def test_duplicates_within_call_removed():
+    transactions = [make_tx("T001"), make_tx("T01"), make_tx("T001"), make_tx("TX9"), make_tx("TX9")]
+
+    valid, _, summary = validate_and_filter(transactions, verbose=False)
+
+    assert [tx["TransactionID"] for tx in valid] == ["T001", "T01", "TX9"]
+    assert summary["duplicates"] == 2
+
+
+def test_store_round_trip(tmp_path):
+    filename = str(tmp_path / "ids.bin")
+
+    store = load_id_store(filename)
+    for transaction_id in ["T001", "T002", "TX-1"]:
+        add_id(store, transaction_id)
+    save_id_store(store)
+
+    store = load_id_store(filename)
+    assert is_duplicate_id(store, "T001")
+    assert is_duplicate_id(store, "TX-1")
+    assert not is_duplicate_id(store, "T1")
+    assert not is_duplicate_id(store, "T003")
+    assert len(store["history"]) == 2
+
+
+def test_filtered_rows_not_recorded(tmp_path):
+    filename = str(tmp_path / "ids.bin")
+
+    store = load_id_store(filename)
+    validate_and_filter(
+        [make_tx("T1"), make_tx("T2", region="South")],
+        region="North", id_store=store, verbose=False
+    )
+    save_id_store(store)
+
+    store = load_id_store(filename)
+    valid, _, summary = validate_and_filter(
+        [make_tx("T1"), make_tx("T2", region="South")], id_store=store, verbose=False
+    )
+
+    assert [tx["TransactionID"] for tx in valid] == ["T2"]
+    assert summary["duplicates"] == 1
+
+
+def test_bloom_filter(tmp_path):
+    filename = str(tmp_path / "ids.bin")
+
+    store = load_id_store(filename, bloom_bits_per_id=10)
+    for i in range(5000):
+        add_id(store, f"T{i:05d}")
+    save_id_store(store)
+
+    # Filter is read back from the file and grows with the history
+    store = load_id_store(filename)
+    assert store["bloom"] is not None
+    assert all(is_duplicate_id(store, f"T{i:05d}") for i in range(5000))
+    assert not is_duplicate_id(store, "T99999")
+
+    for i in range(5000, 20000):
+        add_id(store, f"T{i:05d}")
+    save_id_store(store)
+
+    store = load_id_store(filename)
+    assert all(is_duplicate_id(store, f"T{i:05d}") for i in range(0, 20000, 7))
+
+    # An explicit 0 removes the filter
+    store = load_id_store(filename, bloom_bits_per_id=0)
+    save_id_store(store)
+    store = load_id_store(filename)
+    assert store["bloom"] is None
+    assert is_duplicate_id(store, "T00042")
+
+
+def test_save_needs_filename():
+    with pytest.raises(ValueError):
+        save_id_store(load_id_store())
+
+
+def test_truncated_store_rejected(tmp_path):
+    filename = str(tmp_path / "ids.bin")
+
+    store = load_id_store(filename)
+    add_id(store, "T001")
+    save_id_store(store)
+
+    data = (tmp_path / "ids.bin").read_bytes()
+    for size in (0, 10, len(data) - 4):
+        (tmp_path / "ids.bin").write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            load_id_store(filename)
@@ -0,0 +1,107 @@
+import os
+import random
+
+from utils.data_processor import (
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    generate_sales_report,
+    low_performing_products,
+    new_sales_aggregates,
+    region_wise_sales,
+    top_selling_products,
+    update_sales_aggregates
+)
+
+
+def make_transactions(n, seed=3):
+    rng = random.Random(seed)
+    return [
+        {
+            "TransactionID": f"T{i:05d}",
+            "Date": f"2024-12-{rng.randint(1, 9):02d}",
+            "ProductName": f"Product {rng.randint(1, 40)}",
+            "Quantity": rng.randint(1, 3),
+            "UnitPrice": rng.choice([10.0, 20.0]),
+            "CustomerID": f"C{rng.randint(1, 60):03d}",
+            "Region": rng.choice(["North", "South", "East", "West"])
+        }
+        for i in range(n)
+    ]
+
+
+def test_batched_aggregates_match_analysis_functions():
+    transactions = make_transactions(1500)
+    rng = random.Random(7)
+
+    aggregates = new_sales_aggregates()
+    i = 0
+    while i < len(transactions):
+        step = rng.randint(1, 60)
+        batch = transactions[i:i + step]
+        update_sales_aggregates(aggregates, batch, [])
+        i += step
+
+        seen = transactions[:i]
+        products = aggregates["products"]
+
+        assert [
+            (name, products[name]["quantity"]) for name in aggregates["top_products"]
+        ] == [(name, qty) for name, qty, _ in top_selling_products(seen)]
+
+        assert aggregates["top_customers"] == list(customer_analysis(seen))[:5]
+
+        low = sorted(aggregates["low_products"], key=lambda k: products[k]["quantity"])
+        assert [(name, products[name]["quantity"]) for name in low] == [
+            (name, qty) for name, qty, _ in low_performing_products(seen)
+        ]
+
+        assert aggregates["peak_day"] == find_peak_sales_day(seen)[0]
+
+    regions = region_wise_sales(transactions)
+    assert {
+        region: (data["total_sales"], data["transaction_count"])
+        for region, data in aggregates["regions"].items()
+    } == {
+        region: (data["total_sales"], data["transaction_count"])
+        for region, data in regions.items()
+    }
+
+    daily = daily_sales_trend(transactions)
+    assert {
+        date: (data["revenue"], data["transaction_count"], len(data["customers"]))
+        for date, data in aggregates["daily"].items()
+    } == {
+        date: (data["revenue"], data["transaction_count"], data["unique_customers"])
+        for date, data in daily.items()
+    }
+
+
+def test_generate_sales_report(tmp_path):
+    transactions = make_transactions(200)
+    enriched = [
+        dict(tx, API_Match=tx["ProductName"] != "Product 1") for tx in transactions
+    ]
+    output_file = tmp_path / "report.txt"
+
+    generate_sales_report(transactions, enriched, output_file=str(output_file))
+
+    report = output_file.read_text(encoding="utf-8")
+    total = sum(tx["Quantity"] * tx["UnitPrice"] for tx in transactions)
+    assert f"Records Processed: {len(transactions)}" in report
+    assert f"Total Revenue:        ₹{total:,.2f}" in report
+
+    top_customer = next(iter(customer_analysis(transactions)))
+    assert f"1     {top_customer:<12}" in report
+
+    peak_day, _, _ = find_peak_sales_day(transactions)
+    assert f"Best Selling Day: {peak_day} " in report
+    assert not os.path.exists(str(output_file) + ".tmp")
+
+
+def test_empty_report(tmp_path):
+    output_file = tmp_path / "report.txt"
+
+    generate_sales_report([], [], output_file=str(output_file))
+
+    assert "Records Processed: 0" in output_file.read_text(encoding="utf-8")
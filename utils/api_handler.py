@@ -55,9 +55,11 @@ def create_product_mapping(api_products):
 
     return mapping
 
-def enrich_sales_data(transactions, product_mapping):
+def enrich_sales_data(transactions, product_mapping,
+                      output_file="data/enriched_sales_data.txt"):
     """
     Enriches transactions with API product data
+    Pass output_file=None to skip saving the enriched rows
     """
 
     enriched = []
@@ -86,7 +88,8 @@ def enrich_sales_data(transactions, product_mapping):
         enriched.append(tx_copy)
 
     # Save to file
-    output_file = "data/enriched_sales_data.txt"
+    if output_file is None:
+        return enriched
 
     if enriched:
         headers = enriched[0].keys()
@@ -1,5 +1,14 @@
 # Data parsing, validation, analysis, and reporting functions
 
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+
+from utils.id_store import load_id_store, is_duplicate_id, add_id
+
+
 def parse_transactions(raw_lines):
     """
     Parses raw sales lines into clean list of dictionaries
@@ -50,13 +59,25 @@ def parse_transactions(raw_lines):
     return transactions
 
 
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None,
+                        id_store=None, verbose=True):
     """
-    Validates transactions and applies optional filters
+    Validates transactions, drops repeated TransactionIDs and applies
+    optional filters.
+    Pass an id_store (see utils.id_store) to also drop IDs seen in earlier
+    runs; by default only duplicates within this call are removed.
+    Only IDs of rows that pass the filters are added to the store, so rows
+    filtered out here are still accepted by a later run.
+    verbose=False suppresses the progress output
     """
 
+    if id_store is None:
+        id_store = load_id_store()
+
     valid_transactions = []
     invalid_count = 0
+    duplicate_count = 0
+    ids_in_call = set()
 
     regions = set()
     amounts = []
@@ -75,6 +96,12 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
                 invalid_count += 1
                 continue
 
+            tx_id = tx["TransactionID"]
+            if tx_id in ids_in_call or is_duplicate_id(id_store, tx_id):
+                duplicate_count += 1
+                continue
+            ids_in_call.add(tx_id)
+
             amount = tx["Quantity"] * tx["UnitPrice"]
             tx["Amount"] = amount
 
@@ -87,9 +114,10 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
             invalid_count += 1
 
     # Display filter info
-    print("Available regions:", sorted(regions))
-    if amounts:
-        print("Transaction amount range:", min(amounts), "to", max(amounts))
+    if verbose:
+        print("Available regions:", sorted(regions))
+        if amounts:
+            print("Transaction amount range:", min(amounts), "to", max(amounts))
 
     filtered = valid_transactions
 
@@ -99,7 +127,8 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
         before = len(filtered)
         filtered = [tx for tx in filtered if tx["Region"] == region]
         filtered_by_region = before - len(filtered)
-        print("After region filter:", len(filtered))
+        if verbose:
+            print("After region filter:", len(filtered))
 
     # Amount filters
     filtered_by_amount = 0
@@ -113,12 +142,16 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
         filtered = [tx for tx in filtered if tx["Amount"] <= max_amount]
         filtered_by_amount += before - len(filtered)
 
-    if min_amount or max_amount:
+    if verbose and (min_amount or max_amount):
         print("After amount filter:", len(filtered))
 
+    for tx in filtered:
+        add_id(id_store, tx["TransactionID"])
+
     summary = {
         "total_input": len(transactions),
         "invalid": invalid_count,
+        "duplicates": duplicate_count,
         "filtered_by_region": filtered_by_region,
         "filtered_by_amount": filtered_by_amount,
         "final_count": len(filtered)
@@ -233,6 +266,200 @@ def customer_analysis(transactions):
     return sorted_customers
 
 
+# Spilled partitions are re-partitioned with a new hash salt until they fit
+# the memory budget; past this depth a partition is aggregated in memory
+_MAX_SPILL_DEPTH = 8
+
+
+def _customer_records(transactions):
+    """
+    Yields one partial customer aggregate per transaction:
+    (cid, total_spent, purchase_count, products, first_seen)
+    """
+
+    for i, tx in enumerate(transactions):
+        amount = tx["Quantity"] * tx["UnitPrice"]
+        yield tx["CustomerID"], amount, 1, [tx["ProductName"]], i
+
+
+def _merge_customer_record(customer_data, record):
+    cid, total, count, products, first_seen = record
+
+    if cid not in customer_data:
+        customer_data[cid] = {
+            "total_spent": 0.0,
+            "purchase_count": 0,
+            "products_bought": set(),
+            "first_seen": first_seen
+        }
+
+    data = customer_data[cid]
+    data["total_spent"] += total
+    data["purchase_count"] += count
+    data["products_bought"].update(products)
+    data["first_seen"] = min(data["first_seen"], first_seen)
+
+
+def _spill_customers(customer_data, partition_files, depth):
+    """
+    Appends customer aggregates to hash partitions (salted by depth)
+    """
+
+    for cid, data in customer_data.items():
+        digest = hashlib.blake2b(
+            f"{depth}:{cid}".encode("utf-8"), digest_size=8
+        ).digest()
+        index = int.from_bytes(digest, "big") % len(partition_files)
+        record = [
+            cid,
+            data["total_spent"],
+            data["purchase_count"],
+            sorted(data["products_bought"]),
+            data["first_seen"]
+        ]
+        partition_files[index].write(json.dumps(record) + "\n")
+
+
+def _read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _run_sort_key(row):
+    # Same order as customer_analysis: total_spent descending, ties in
+    # order of first appearance
+    return (-row[1], row[5])
+
+
+def _write_customer_run(rows, spill_dir):
+    with tempfile.NamedTemporaryFile(
+        "w", dir=spill_dir, suffix=".run", delete=False, encoding="utf-8"
+    ) as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    return f.name
+
+
+def _sorted_customer_run(records, memory_budget, spill_dir, fan_out, depth=0):
+    """
+    Aggregates customer records into one run file sorted by total_spent.
+    Whenever more than memory_budget customers are held, they are spilled
+    to hash partitions; each partition is then aggregated recursively and
+    the resulting runs are k-way merged
+    """
+
+    customer_data = {}
+    partition_files = None
+
+    for record in records:
+        _merge_customer_record(customer_data, record)
+
+        if len(customer_data) > memory_budget and depth < _MAX_SPILL_DEPTH:
+            if partition_files is None:
+                partition_files = [
+                    tempfile.NamedTemporaryFile(
+                        "w", dir=spill_dir, suffix=".part", delete=False,
+                        encoding="utf-8"
+                    )
+                    for _ in range(fan_out)
+                ]
+            _spill_customers(customer_data, partition_files, depth)
+            customer_data.clear()
+
+    # Everything fit in memory: sort and write a single run
+    if partition_files is None:
+        rows = []
+        for cid, data in customer_data.items():
+            total = data["total_spent"]
+            count = data["purchase_count"]
+            rows.append([
+                cid,
+                total,
+                count,
+                sorted(data["products_bought"]),
+                round(total / count, 2),
+                data["first_seen"]
+            ])
+        rows.sort(key=_run_sort_key)
+        return _write_customer_run(rows, spill_dir)
+
+    _spill_customers(customer_data, partition_files, depth)
+    customer_data.clear()
+
+    child_runs = []
+    for part in partition_files:
+        part.close()
+        child_runs.append(_sorted_customer_run(
+            _read_jsonl(part.name), memory_budget, spill_dir, fan_out, depth + 1
+        ))
+        os.remove(part.name)
+
+    merged = heapq.merge(
+        *(_read_jsonl(path) for path in child_runs), key=_run_sort_key
+    )
+    run_path = _write_customer_run(merged, spill_dir)
+
+    for path in child_runs:
+        os.remove(path)
+
+    return run_path
+
+
+def customer_analysis_external(transactions, memory_budget=100000, top_k=5,
+                               output_file=None, spill_dir=None, fan_out=16):
+    """
+    Disk-backed customer_analysis for very high customer counts.
+    Holds at most memory_budget customers in memory at a time, spilling
+    hash partitions to temporary files under spill_dir.
+    Returns the top_k customers as (cid, data) pairs in the same order and
+    format as customer_analysis; if output_file is given, the full
+    per-customer output is written there in the same order.
+    Inputs that fit the budget match customer_analysis exactly; once
+    partial totals are spilled, totals may differ by float rounding.
+    transactions is consumed once, so pass a generator to keep the whole
+    run within the budget; a list is already held in memory by the caller
+    """
+
+    if memory_budget < 1:
+        raise ValueError("memory_budget must be at least 1")
+
+    top_customers = []
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp_dir:
+        run_path = _sorted_customer_run(
+            _customer_records(transactions), memory_budget, tmp_dir, fan_out
+        )
+
+        out = open(output_file, "w") if output_file else None
+        try:
+            if out:
+                out.write(
+                    "CustomerID|TotalSpent|PurchaseCount|AvgOrderValue|ProductsBought\n"
+                )
+
+            for cid, total, count, products, avg, _ in _read_jsonl(run_path):
+                if len(top_customers) < top_k:
+                    top_customers.append((cid, {
+                        "total_spent": total,
+                        "purchase_count": count,
+                        "products_bought": products,
+                        "avg_order_value": avg
+                    }))
+                elif out is None:
+                    break
+
+                if out:
+                    out.write(
+                        f"{cid}|{total}|{count}|{avg}|{','.join(products)}\n"
+                    )
+        finally:
+            if out:
+                out.close()
+
+    return top_customers
+
+
 def daily_sales_trend(transactions):
     daily_data = {}
 
@@ -310,35 +537,206 @@ def low_performing_products(transactions, threshold=10):
 from datetime import datetime
 
 
-def generate_sales_report(transactions, enriched_transactions, output_file="output/sales_report.txt"):
+def new_sales_aggregates(top_n=5, low_threshold=10):
+    """
+    Creates empty running aggregates for the sales report
+    """
+
+    return {
+        "top_n": top_n,
+        "low_threshold": low_threshold,
+        "total_revenue": 0.0,
+        "total_transactions": 0,
+        "min_date": None,
+        "max_date": None,
+        "regions": {},
+        "products": {},
+        "customers": {},
+        "daily": {},
+        "top_products": [],
+        "top_customers": [],
+        "low_products": {},
+        "peak_day": None,
+        "enriched_total": 0,
+        "enriched_success": 0,
+        "failed_products": {}
+    }
+
+
+def _update_top(top, entries, touched, value_key, n):
+    """
+    Re-ranks a top-n list of keys after the entries in touched changed.
+    Totals only grow (valid transactions have positive amounts), so an
+    entry outside the old top-n that was not touched cannot move into it.
+    Ties keep first-appearance order, like the full sorts in this module
+    """
+
+    candidates = set(top) | touched
+    top[:] = heapq.nsmallest(
+        n,
+        candidates,
+        key=lambda k: (-entries[k][value_key], entries[k]["order"])
+    )
+
+
+def update_sales_aggregates(aggregates, transactions, enriched_transactions):
+    """
+    Adds a batch of valid and enriched transactions to the running
+    aggregates in place. The ranked sections of the report are updated
+    from the entries this batch touched only
+    """
+
+    products = aggregates["products"]
+    customers = aggregates["customers"]
+    daily = aggregates["daily"]
+
+    touched_products = set()
+    touched_customers = set()
+    touched_days = set()
+
+    for tx in transactions:
+        amount = tx["Quantity"] * tx["UnitPrice"]
+        date = tx["Date"]
+        name = tx["ProductName"]
+        cid = tx["CustomerID"]
+
+        aggregates["total_revenue"] += amount
+        aggregates["total_transactions"] += 1
+
+        if aggregates["min_date"] is None or date < aggregates["min_date"]:
+            aggregates["min_date"] = date
+        if aggregates["max_date"] is None or date > aggregates["max_date"]:
+            aggregates["max_date"] = date
+
+        region = aggregates["regions"].setdefault(
+            tx["Region"], {"total_sales": 0.0, "transaction_count": 0}
+        )
+        region["total_sales"] += amount
+        region["transaction_count"] += 1
+
+        if name not in products:
+            products[name] = {"quantity": 0, "revenue": 0.0, "order": len(products)}
+        products[name]["quantity"] += tx["Quantity"]
+        products[name]["revenue"] += amount
+        touched_products.add(name)
+
+        if cid not in customers:
+            customers[cid] = {"total_spent": 0.0, "purchase_count": 0, "order": len(customers)}
+        customers[cid]["total_spent"] += amount
+        customers[cid]["purchase_count"] += 1
+        touched_customers.add(cid)
+
+        day = daily.setdefault(
+            date, {"revenue": 0.0, "transaction_count": 0, "customers": set()}
+        )
+        day["revenue"] += amount
+        day["transaction_count"] += 1
+        day["customers"].add(cid)
+        touched_days.add(date)
+
+    n = aggregates["top_n"]
+    _update_top(aggregates["top_products"], products, touched_products, "quantity", n)
+    _update_top(aggregates["top_customers"], customers, touched_customers, "total_spent", n)
+
+    # Quantities only grow, so products can leave the low list but never
+    # re-enter; adding in first-appearance order keeps the dict in that order
+    low_products = aggregates["low_products"]
+    for name in sorted(touched_products, key=lambda k: products[k]["order"]):
+        if products[name]["quantity"] < aggregates["low_threshold"]:
+            low_products[name] = True
+        else:
+            low_products.pop(name, None)
+
+    # Peak day: highest revenue, earliest date on ties
+    peak = aggregates["peak_day"]
+    for date in touched_days:
+        revenue = daily[date]["revenue"]
+        if revenue <= 0:
+            continue
+        if (
+            peak is None
+            or revenue > daily[peak]["revenue"]
+            or (revenue == daily[peak]["revenue"] and date < peak)
+        ):
+            peak = date
+    aggregates["peak_day"] = peak
+
+    for tx in enriched_transactions:
+        aggregates["enriched_total"] += 1
+        if tx.get("API_Match"):
+            aggregates["enriched_success"] += 1
+        else:
+            aggregates["failed_products"][tx["ProductName"]] = True
+
+
+def write_sales_report(aggregates, output_file="output/sales_report.txt"):
+    """
+    Renders the report from running aggregates. Only the sections that list
+    every region or day iterate over them; ranked sections come precomputed.
+    The file is written to a temporary path and then renamed, so readers
+    never see a partial report
+    """
+
     # ---- HEADER ----
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    total_records = len(transactions)
+    total_records = aggregates["total_transactions"]
 
     # ---- OVERALL SUMMARY ----
-    total_revenue = calculate_total_revenue(transactions)
-    total_transactions = len(transactions)
+    total_revenue = aggregates["total_revenue"]
+    total_transactions = aggregates["total_transactions"]
     avg_order_value = total_revenue / total_transactions if total_transactions else 0
 
-    dates = [tx["Date"] for tx in transactions]
-    date_range = f"{min(dates)} to {max(dates)}" if dates else "N/A"
+    if aggregates["min_date"] is not None:
+        date_range = f"{aggregates['min_date']} to {aggregates['max_date']}"
+    else:
+        date_range = "N/A"
 
     # ---- REGION PERFORMANCE ----
-    regions = region_wise_sales(transactions)
+    regions = {}
+    for region, data in sorted(aggregates["regions"].items(),
+                               key=lambda x: x[1]["total_sales"],
+                               reverse=True):
+        regions[region] = {
+            "total_sales": data["total_sales"],
+            "transaction_count": data["transaction_count"],
+            "percentage": round((data["total_sales"] / total_revenue) * 100, 2)
+        }
 
     # ---- TOP PRODUCTS ----
-    top_products = top_selling_products(transactions, n=5)
+    products = aggregates["products"]
+    top_products = [
+        (name, products[name]["quantity"], products[name]["revenue"])
+        for name in aggregates["top_products"]
+    ]
 
     # ---- TOP CUSTOMERS ----
-    customers = customer_analysis(transactions)
-    top_customers = list(customers.items())[:5]
+    top_customers = [
+        (cid, aggregates["customers"][cid]) for cid in aggregates["top_customers"]
+    ]
 
     # ---- DAILY TREND ----
-    daily_trend = daily_sales_trend(transactions)
+    daily_trend = {}
+    for date in sorted(aggregates["daily"]):
+        data = aggregates["daily"][date]
+        daily_trend[date] = {
+            "revenue": data["revenue"],
+            "transaction_count": data["transaction_count"],
+            "unique_customers": len(data["customers"])
+        }
 
     # ---- PRODUCT PERFORMANCE ----
-    peak_day, peak_revenue, peak_tx_count = find_peak_sales_day(transactions)
-    low_products = low_performing_products(transactions)
+    peak_day = aggregates["peak_day"]
+    peak_revenue = 0
+    peak_tx_count = 0
+    if peak_day is not None:
+        peak_revenue = aggregates["daily"][peak_day]["revenue"]
+        peak_tx_count = aggregates["daily"][peak_day]["transaction_count"]
+
+    low_products = [
+        (name, products[name]["quantity"], products[name]["revenue"])
+        for name in aggregates["low_products"]
+    ]
+    low_products.sort(key=lambda x: x[1])
 
     # Avg transaction value per region
     avg_region_value = {}
@@ -346,15 +744,13 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
         avg_region_value[region] = data["total_sales"] / data["transaction_count"]
 
     # ---- API ENRICHMENT SUMMARY ----
-    total_enriched = len(enriched_transactions)
-    success = [tx for tx in enriched_transactions if tx.get("API_Match")]
-    failed = [tx for tx in enriched_transactions if not tx.get("API_Match")]
-
-    success_rate = (len(success) / total_enriched * 100) if total_enriched else 0
-    failed_products = list(set(tx["ProductName"] for tx in failed))
+    total_enriched = aggregates["enriched_total"]
+    success_rate = (aggregates["enriched_success"] / total_enriched * 100) if total_enriched else 0
+    failed_products = list(aggregates["failed_products"])
 
     # ---- WRITE REPORT ----
-    with open(output_file, "w") as f:
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, "w") as f:
         f.write("=" * 50 + "\n")
         f.write("        SALES ANALYTICS REPORT\n")
         f.write(f"   Generated: {now}\n")
@@ -433,6 +829,14 @@ def generate_sales_report(transactions, enriched_transactions, output_file="outp
         else:
             f.write("None\n")
 
+    os.replace(tmp_file, output_file)
+
+
+def generate_sales_report(transactions, enriched_transactions, output_file="output/sales_report.txt"):
+    aggregates = new_sales_aggregates()
+    update_sales_aggregates(aggregates, transactions, enriched_transactions)
+    write_sales_report(aggregates, output_file)
+
     print("Sales report generated at", output_file)
 
 
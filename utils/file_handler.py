@@ -1,5 +1,8 @@
 # Handles reading sales data with multiple encodings
 
+import os
+
+
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues
@@ -34,3 +37,129 @@ def read_sales_data(filename):
 
     return lines
 
+
+
+# Bytes kept from the start of the file and from just before the read
+# offset, used to notice a file rewritten in place
+_FINGERPRINT_BYTES = 256
+
+
+def new_tail_state():
+    """
+    Creates the read position used by read_appended_lines
+    """
+
+    return {
+        "file": None,
+        "inode": None,
+        "offset": 0,
+        "partial": b"",
+        "skip_header": True,
+        "head": b"",
+        "tail": b"",
+        "restarted": None
+    }
+
+
+def close_tail_state(state):
+    if state["file"] is not None:
+        state["file"].close()
+        state["file"] = None
+
+
+def _decode_line(raw):
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def _read_new_bytes(state):
+    file = state["file"]
+    file.seek(state["offset"])
+    data = file.read()
+
+    state["offset"] += len(data)
+    if len(state["head"]) < _FINGERPRINT_BYTES:
+        state["head"] = (state["head"] + data)[:_FINGERPRINT_BYTES]
+    state["tail"] = (state["tail"] + data)[-_FINGERPRINT_BYTES:]
+
+    return data
+
+
+def _fingerprint_matches(state):
+    file = state["file"]
+
+    file.seek(0)
+    if file.read(len(state["head"])) != state["head"]:
+        return False
+
+    file.seek(state["offset"] - len(state["tail"]))
+    return file.read(len(state["tail"])) == state["tail"]
+
+
+def _split_lines(state, data, final=False):
+    *complete, state["partial"] = (state["partial"] + data).split(b"\n")
+
+    # The last line of a rotated file will not be completed any more
+    if final and state["partial"]:
+        complete.append(state["partial"])
+        state["partial"] = b""
+
+    lines = []
+    for raw in complete:
+        if state["skip_header"]:
+            state["skip_header"] = False
+            continue
+
+        line = _decode_line(raw).strip()
+        if line:
+            lines.append(line)
+
+    return lines
+
+
+def read_appended_lines(filename, state):
+    """
+    Returns complete lines appended to the file since the last call
+    (header and empty lines skipped, like read_sales_data).
+    A trailing line without a newline is held back until it is completed.
+    If the file is replaced (rotation), the rest of the old file is
+    returned and state["restarted"] is set to "rotated"; if it is truncated
+    or rewritten in place, nothing is returned and it is set to
+    "truncated". In both cases the next call reads the file from the start.
+    The caller clears state["restarted"] once it has handled it
+    """
+
+    lines = []
+
+    try:
+        path_inode = os.stat(filename).st_ino
+    except FileNotFoundError:
+        path_inode = None
+
+    if state["file"] is not None and path_inode != state["inode"]:
+        lines.extend(_split_lines(state, _read_new_bytes(state), final=True))
+        close_tail_state(state)
+        state.update(new_tail_state())
+        state["restarted"] = "rotated"
+        return lines
+
+    if state["file"] is None:
+        try:
+            state["file"] = open(filename, "rb")
+        except FileNotFoundError:
+            # Rotated away and not recreated yet
+            return lines
+        state["inode"] = os.fstat(state["file"].fileno()).st_ino
+
+    size = os.fstat(state["file"].fileno()).st_size
+    if size < state["offset"] or not _fingerprint_matches(state):
+        file, inode = state["file"], state["inode"]
+        state.update(new_tail_state())
+        state["file"], state["inode"] = file, inode
+        state["restarted"] = "truncated"
+        return lines
+
+    lines.extend(_split_lines(state, _read_new_bytes(state)))
+    return lines
@@ -0,0 +1,231 @@
+# Compact TransactionID store used to drop duplicate transactions,
+# within a run and across runs
+
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+from array import array
+
+# File layout: header (int ID count, string ID count, Bloom filter bytes,
+# Bloom bits per ID, Bloom hash count), sorted int64 IDs, Bloom filter bits,
+# then the non-numeric IDs as newline separated UTF-8
+_HEADER = struct.Struct("<QQQII")
+
+_MAX_ENCODED_DIGITS = 17
+
+_WRITE_CHUNK = 65536
+
+
+def _encode_id(transaction_id):
+    """
+    Encodes IDs like T018 as an integer (1018); the leading 1 keeps
+    zero-padded IDs distinct. Returns None for IDs that cannot be encoded
+    """
+
+    digits = transaction_id[1:]
+    if (
+        transaction_id.startswith("T")
+        and digits.isdigit()
+        and digits.isascii()
+        and len(digits) <= _MAX_ENCODED_DIGITS
+    ):
+        return int("1" + digits)
+    return None
+
+
+def _bloom_positions(bloom, hashes, key):
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    size = len(bloom) * 8
+    return [(h1 + i * h2) % size for i in range(hashes)]
+
+
+def _bloom_add(bloom, hashes, key):
+    for pos in _bloom_positions(bloom, hashes, key):
+        bloom[pos >> 3] |= 1 << (pos & 7)
+
+
+def _bloom_contains(bloom, hashes, key):
+    for pos in _bloom_positions(bloom, hashes, key):
+        if not bloom[pos >> 3] & (1 << (pos & 7)):
+            return False
+    return True
+
+
+def _close_history(store):
+    if store["mapping"] is not None:
+        store["history"].release()
+        store["mapping"].close()
+        store["mapping"] = None
+    store["history"] = array("q")
+
+
+def _open_history(store, filename):
+    """
+    Memory-maps the sorted ID history of a store file, so lookups only
+    touch the pages they bisect through
+    """
+
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError(f"TransactionID store {filename} is truncated")
+
+        int_count, str_count, bloom_bytes, bits_per_id, hashes = _HEADER.unpack(
+            f.read(_HEADER.size)
+        )
+        ids_end = _HEADER.size + int_count * 8
+        bloom_end = ids_end + bloom_bytes
+        if size < bloom_end:
+            raise ValueError(f"TransactionID store {filename} is truncated")
+
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    store["mapping"] = mapping
+    store["history"] = memoryview(mapping)[_HEADER.size:ids_end].cast("q")
+
+    # An explicit bloom_bits_per_id of 0 drops the stored filter
+    if bloom_bytes and store["bloom_bits_per_id"] != 0:
+        store["bloom"] = bytearray(mapping[ids_end:bloom_end])
+        store["bloom_hashes"] = hashes
+        if store["bloom_bits_per_id"] is None:
+            store["bloom_bits_per_id"] = bits_per_id
+
+    if str_count:
+        store["history_other"] = set(mapping[bloom_end:].decode("utf-8").split("\n"))
+
+
+def load_id_store(filename=None, bloom_bits_per_id=None, bloom_hashes=7):
+    """
+    Loads a TransactionID store, or creates an empty one if filename is
+    None or does not exist yet.
+    IDs from earlier runs are kept in a memory-mapped sorted int64 array;
+    IDs accepted in this run go into a set until save_id_store merges them.
+    bloom_bits_per_id > 0 keeps a Bloom filter in the store file (about
+    10 bits per ID gives ~1% false positives) so most new IDs skip the
+    history lookup entirely; 0 removes an existing filter on the next save
+    and None keeps whatever the file has
+    """
+
+    store = {
+        "filename": filename,
+        "mapping": None,
+        "history": array("q"),
+        "history_other": set(),
+        "new_ids": set(),
+        "new_other": set(),
+        "bloom": None,
+        "bloom_bits_per_id": bloom_bits_per_id,
+        "bloom_hashes": bloom_hashes
+    }
+
+    if filename and os.path.exists(filename):
+        _open_history(store, filename)
+
+    return store
+
+
+def _in_history(store, key):
+    bloom = store["bloom"]
+    if bloom is not None and not _bloom_contains(bloom, store["bloom_hashes"], key):
+        return False
+
+    history = store["history"]
+    i = bisect.bisect_left(history, key)
+    return i < len(history) and history[i] == key
+
+
+def is_duplicate_id(store, transaction_id):
+    """
+    Returns True if transaction_id is already in the store
+    """
+
+    key = _encode_id(transaction_id)
+
+    if key is None:
+        return (
+            transaction_id in store["new_other"]
+            or transaction_id in store["history_other"]
+        )
+
+    return key in store["new_ids"] or _in_history(store, key)
+
+
+def add_id(store, transaction_id):
+    """
+    Records transaction_id as seen
+    """
+
+    key = _encode_id(transaction_id)
+
+    if key is None:
+        store["new_other"].add(transaction_id)
+    else:
+        store["new_ids"].add(key)
+
+
+def save_id_store(store, filename=None):
+    """
+    Merges IDs accepted in this run into the history and writes the store
+    """
+
+    filename = filename or store["filename"]
+    if not filename:
+        raise ValueError("save_id_store needs a filename for an in-memory store")
+
+    new_ids = sorted(store["new_ids"])
+    int_count = len(store["history"]) + len(new_ids)
+    history_other = store["history_other"] | store["new_other"]
+    other = "\n".join(sorted(history_other)).encode("utf-8")
+
+    # Reuse the Bloom filter while it has room, otherwise rebuild it with
+    # 2x headroom so rebuilds stay rare as the history grows
+    bloom = store["bloom"]
+    bits_per_id = store["bloom_bits_per_id"] or 0
+    hashes = store["bloom_hashes"]
+    rebuild = bits_per_id > 0 and (
+        bloom is None or int_count > len(bloom) * 8 // bits_per_id
+    )
+    if rebuild:
+        bloom = bytearray(max(8, (2 * int_count * bits_per_id + 7) // 8))
+    elif bloom is not None:
+        for key in new_ids:
+            _bloom_add(bloom, hashes, key)
+
+    tmp_file = filename + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(_HEADER.pack(
+            int_count,
+            len(history_other),
+            len(bloom) if bloom is not None else 0,
+            bits_per_id if bloom is not None else 0,
+            hashes if bloom is not None else 0
+        ))
+
+        chunk = array("q")
+        for key in heapq.merge(store["history"], new_ids):
+            chunk.append(key)
+            if rebuild:
+                _bloom_add(bloom, hashes, key)
+            if len(chunk) >= _WRITE_CHUNK:
+                chunk.tofile(f)
+                chunk = array("q")
+        chunk.tofile(f)
+
+        if bloom is not None:
+            f.write(bloom)
+        f.write(other)
+
+    _close_history(store)
+    os.replace(tmp_file, filename)
+
+    store["filename"] = filename
+    store["new_ids"] = set()
+    store["new_other"] = set()
+    store["history_other"] = set()
+    store["bloom"] = None
+    _open_history(store, filename)